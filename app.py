@@ -1,5 +1,95 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from typing import TYPE_CHECKING, Optional
+
 import streamlit as st
-import pandas as pd
+
+# pandas/numpy/pyarrow/altair are imported where they are first needed, so
+# the page shell can render before the data stack has loaded.
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+# Sent to the browser via st.html, which skips the markdown parser
+_CSS = """
+<style>
+.main .block-container {
+    padding-top: 1rem;
+    padding-bottom: 2rem;
+    padding-left: 2rem;
+    padding-right: 2rem;
+}
+
+.stApp {
+    background: linear-gradient(135deg, #1e1b4b, #0f766e 40%, #f97316 90%);
+    color: #f9fafb;
+    font-family: system-ui, -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
+}
+
+.leaderboard-title {
+    font-size: 2.6rem;
+    font-weight: 800;
+    color: #fefce8;
+    text-shadow: 0 0 20px rgba(0,0,0,0.7);
+    letter-spacing: 0.03em;
+}
+.leaderboard-subtitle {
+    font-size: 1rem;
+    color: #e5e7eb;
+    opacity: 0.9;
+}
+
+.top-cards {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 1rem;
+}
+.rank-card {
+    flex: 1 1 16rem;
+    background: rgba(15,23,42,0.86);
+    border-radius: 1.3rem;
+    padding: 1.3rem 1.5rem;
+    box-shadow: 0 18px 45px rgba(15,23,42,0.7);
+    border: 1px solid rgba(148,163,184,0.3);
+}
+.rank-title {
+    font-size: 0.9rem;
+    text-transform: uppercase;
+    letter-spacing: 0.12em;
+    color: #9ca3af;
+    margin-bottom: 0.4rem;
+}
+.rank-name {
+    font-size: 1.4rem;
+    font-weight: 700;
+    color: #f9fafb;
+    display: flex;
+    align-items: center;
+    gap: 0.4rem;
+}
+.rank-score {
+    font-size: 2rem;
+    font-weight: 800;
+    margin-top: 0.4rem;
+    color: #22c55e;
+}
+.rank-meta {
+    font-size: 0.85rem;
+    color: #d1d5db;
+    margin-top: 0.2rem;
+}
+
+.dataframe td, .dataframe th {
+    color: #0f172a !important;
+}
+
+footer {visibility: hidden;}
+header {visibility: hidden;}
+</style>
+"""
 
 # =========================
 # PAGE CONFIG
@@ -13,79 +103,7 @@ st.set_page_config(
 # =========================
 # CUSTOM CSS (VIBES)
 # =========================
-st.markdown(
-    """
-    <style>
-    .main .block-container {
-        padding-top: 1rem;
-        padding-bottom: 2rem;
-        padding-left: 2rem;
-        padding-right: 2rem;
-    }
-
-    .stApp {
-        background: linear-gradient(135deg, #1e1b4b, #0f766e 40%, #f97316 90%);
-        color: #f9fafb;
-        font-family: system-ui, -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
-    }
-
-    .leaderboard-title {
-        font-size: 2.6rem;
-        font-weight: 800;
-        color: #fefce8;
-        text-shadow: 0 0 20px rgba(0,0,0,0.7);
-        letter-spacing: 0.03em;
-    }
-    .leaderboard-subtitle {
-        font-size: 1rem;
-        color: #e5e7eb;
-        opacity: 0.9;
-    }
-
-    .rank-card {
-        background: rgba(15,23,42,0.86);
-        border-radius: 1.3rem;
-        padding: 1.3rem 1.5rem;
-        box-shadow: 0 18px 45px rgba(15,23,42,0.7);
-        border: 1px solid rgba(148,163,184,0.3);
-    }
-    .rank-title {
-        font-size: 0.9rem;
-        text-transform: uppercase;
-        letter-spacing: 0.12em;
-        color: #9ca3af;
-        margin-bottom: 0.4rem;
-    }
-    .rank-name {
-        font-size: 1.4rem;
-        font-weight: 700;
-        color: #f9fafb;
-        display: flex;
-        align-items: center;
-        gap: 0.4rem;
-    }
-    .rank-score {
-        font-size: 2rem;
-        font-weight: 800;
-        margin-top: 0.4rem;
-        color: #22c55e;
-    }
-    .rank-meta {
-        font-size: 0.85rem;
-        color: #d1d5db;
-        margin-top: 0.2rem;
-    }
-
-    .dataframe td, .dataframe th {
-        color: #0f172a !important;
-    }
-
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+st.html(_CSS)
 
 # =========================
 # DATA HELPERS
@@ -102,6 +120,9 @@ REQUIRED_COLUMNS = [
 
 def preprocess_scores(df: pd.DataFrame) -> pd.DataFrame:
     """Validate columns, convert types, sort, and add Rank."""
+    import numpy as np
+    import pandas as pd
+
     missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
     if missing:
         st.error(
@@ -110,23 +131,238 @@ def preprocess_scores(df: pd.DataFrame) -> pd.DataFrame:
         )
         st.stop()
 
-    df = df.copy()
-
-    numeric_cols = ["Reputation", "Orders", "Accuracy_%", "Budget_Left"]
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+    # assign() builds a new frame, so the caller's df is never mutated.
+    # Integer columns are downcast to the smallest dtype that holds them (they
+    # stay float if they have gaps). Accuracy_% stays float64: float32 would
+    # print 92.3 as 92.30000305175781.
+    numeric_cols = {
+        "Reputation": "integer",
+        "Orders": "integer",
+        "Accuracy_%": None,
+        "Budget_Left": "integer",
+    }
+    df = df.assign(
+        **{
+            c: pd.to_numeric(df[c], errors="coerce", downcast=kind)
+            for c, kind in numeric_cols.items()
+        }
+    )
 
-    df = df.sort_values("Reputation", ascending=False).reset_index(drop=True)
-    df["Rank"] = df.index + 1
+    df = df.sort_values("Reputation", ascending=False, ignore_index=True, kind="stable")
+    df["Rank"] = np.arange(1, len(df) + 1, dtype=np.int32)
+
+    # Card-ready text for the columns that may have gaps, so rendering is
+    # plain string substitution (a missing Badges cell would otherwise
+    # format as "<NA>" and land in the card markup as a tag)
+    df["Badges"] = df["Badges"].fillna("-")
+    for col in ("Orders", "Budget_Left"):
+        values = df[col]
+        df[f"{col}_str"] = np.where(
+            values.isna(), "-", values.fillna(0).astype("int64").astype(str)
+        )
     return df
 
 
+def top_n(df: pd.DataFrame, col: str, k: int, ascending: bool) -> pd.DataFrame:
+    """Return the k best rows by `col`, sorted, without sorting the whole frame."""
+    import pandas as pd
+
+    # keep="first" breaks ties at the cut-off by original position, exactly
+    # like a stable sort followed by head(k)
+    pick = df.nsmallest if ascending else df.nlargest
+    sub = pick(k, col, keep="first")
+
+    if len(sub) < k:
+        # Missing values always go last, like sort_values' default na_position
+        sub = pd.concat([sub, df[df[col].isna()].head(k - len(sub))])
+    return sub
+
+
+def read_scores_excel(source) -> pd.DataFrame:
+    """Read a scores workbook, preferring the native calamine parser."""
+    import pandas as pd
+
+    # A callable usecols skips extra columns without raising on missing ones,
+    # so preprocess_scores can still report those nicely.
+    read_kwargs = dict(
+        usecols=lambda c: c in REQUIRED_COLUMNS,
+        dtype={"Team": "string", "Badges": "string"},
+    )
+    try:
+        return pd.read_excel(source, engine="calamine", **read_kwargs)
+    except ImportError:
+        # python-calamine not installed -- fall back to the pure-Python reader
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return pd.read_excel(source, engine="openpyxl", **read_kwargs)
+
+
+# Bump whenever preprocess_scores changes its output, so sidecars written by
+# an older version are ignored instead of served
+_SIDECAR_VERSION = 3
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
 @st.cache_data
-def load_default_scores(path: str = "scores.xlsx") -> pd.DataFrame:
-    df = pd.read_excel(path)
+def load_default_scores(
+    path: str = "scores.xlsx",
+) -> tuple[pd.DataFrame, Optional[float]]:
+    """Preprocessed default scores, plus the xlsx mtime they were built from."""
+    import pandas as pd
+
+    # Preprocessed copy of the workbook, reused while it is newer than the xlsx.
+    # The version in the name ties it to the preprocess_scores that wrote it.
+    sidecar = f"{os.path.splitext(path)[0]}.v{_SIDECAR_VERSION}.parquet"
+    xlsx_mtime = _mtime(path)
+    parquet_mtime = _mtime(sidecar)
+
+    # No xlsx means no sidecar either: fall through so the missing file errors
+    if xlsx_mtime is not None and parquet_mtime is not None and parquet_mtime > xlsx_mtime:
+        try:
+            df = pd.read_parquet(sidecar, engine="pyarrow")
+        except Exception:
+            df = None
+        expected = REQUIRED_COLUMNS + ["Rank", "Orders_str", "Budget_Left_str"]
+        if df is not None and set(expected) <= set(df.columns):
+            return df, xlsx_mtime
+
+    df = preprocess_scores(read_scores_excel(path))
+    try:
+        df.to_parquet(sidecar, engine="pyarrow", compression="zstd")
+    except Exception:
+        # The sidecar is only a cache: read-only checkout, no pyarrow, or a
+        # column pyarrow can't type -- just skip it
+        pass
+    return df, xlsx_mtime
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_uploaded_scores(content_hash: str, _uploaded_file) -> pd.DataFrame:
+    # Spill the upload to disk straight from its buffer so the parser reads
+    # a path instead of another in-memory copy of the bytes.
+    with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
+        tmp.write(_uploaded_file.getbuffer())
+        tmp_path = tmp.name
+    try:
+        df = read_scores_excel(tmp_path)
+    finally:
+        os.remove(tmp_path)
     return preprocess_scores(df)
 
 
+DISPLAY_COLUMNS = ["Rank", "Team", "Reputation", "Orders", "Accuracy_%", "Budget_Left", "Badges"]
+CARD_COLUMNS = ["Rank", "Team", "Reputation", "Orders_str", "Accuracy_%", "Budget_Left_str", "Badges"]
+
+
+# One template for every card; fields are CARD_COLUMNS plus crown/accent
+_CARD_TPL = """
+        <div class="rank-card">
+            <div class="rank-title">Rank {Rank}</div>
+            <div class="rank-name">{crown} {Team} {accent}</div>
+            <div class="rank-score">
+                {Reputation}
+                <span style="font-size:0.9rem; margin-left:0.2rem; font-weight:500;">
+                    Reputation
+                </span>
+            </div>
+            <div class="rank-meta">
+                Orders: <b>{Orders_str}</b> · 
+                Accuracy: <b>{Accuracy_%}%</b> · 
+                Budget left: <b>₹{Budget_Left_str}</b><br/>
+                Badges: {Badges}
+            </div>
+        </div>"""
+
+
+def card_html(rec: tuple, crown: str, accent: str) -> str:
+    """HTML for a single TOP-3 spotlight card; `rec` is ordered as CARD_COLUMNS."""
+    row = dict(zip(CARD_COLUMNS, rec), crown=crown, accent=accent)
+    return _CARD_TPL.format_map(row)
+
+
+@st.cache_data(show_spinner=False)
+def build_top3_html(rows: tuple) -> str:
+    """Markup for the whole TOP-3 row; `rows` holds CARD_COLUMNS tuples."""
+    crowns = ["🥇", "🥈", "🥉"]
+    accent_emojis = ["🔥", "⚡", "💥"]
+    cards = "".join(
+        card_html(rec, crowns[i], accent_emojis[i]) for i, rec in enumerate(rows)
+    )
+    return f'<div class="top-cards">{cards}\n</div>'
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def sorted_view(
+    data_key: str, sort_option: str, ascending: bool, n: int, _df: pd.DataFrame
+) -> pd.DataFrame:
+    """Sorted, re-ranked top-n slice of the scores.
+
+    `_df` is skipped by Streamlit's hasher; `data_key` identifies its contents.
+    """
+    import numpy as np
+
+    if sort_option == "Reputation" and not ascending:
+        # preprocess_scores already sorted and ranked in this order
+        return _df.head(n)
+
+    view = top_n(_df, sort_option, n, ascending).reset_index(drop=True)
+    view["Rank"] = np.arange(1, len(view) + 1, dtype=np.int32)
+    return view
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def leaderboard_table(
+    data_key: str, sort_option: str, ascending: bool, n: int, _view: pd.DataFrame
+) -> pa.Table:
+    """Arrow table for st.dataframe, converted once per sorted view."""
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(_view[DISPLAY_COLUMNS], preserve_index=False)
+
+
+def render_charts(df_sorted: pd.DataFrame) -> None:
+    """Reputation and accuracy bars as one chart faceted by metric."""
+    import altair as alt
+
+    # Both metrics in one long frame -> one chart, one serialization of Team
+    melted = df_sorted[["Team", "Reputation", "Accuracy_%"]].melt(
+        "Team", var_name="metric", value_name="value"
+    )
+    # Streamlit can't stretch a facet chart to the container, so each panel
+    # gets an explicit size -- roughly half the wide layout, as before
+    chart = (
+        alt.Chart(melted)
+        .mark_bar()
+        .encode(x="Team:N", y="value:Q")
+        .properties(width=460, height=300)
+        .facet(column=alt.Column("metric:N", title=None))
+        .resolve_scale(y="independent")
+    )
+    st.altair_chart(chart)
+
+
+# =========================
+# HEADER
+# =========================
+st.html(
+    """
+    <div class="leaderboard-title">
+        🏭 Factory Frenzy Leaderboard
+    </div>
+    <div class="leaderboard-subtitle">
+        Real-time bragging rights for the most efficient (and least chaotic) factory teams.
+    </div>
+    """
+)
+
+st.markdown("")
+
 # =========================
 # SIDEBAR
 # =========================
@@ -142,11 +378,16 @@ with st.sidebar:
 
     # Load data
     if uploaded_file is not None:
-        df = pd.read_excel(uploaded_file)
-        df = preprocess_scores(df)
+        # Keyed on content, so re-uploading the same workbook hits the cache
+        content_hash = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+        df = load_uploaded_scores(content_hash, uploaded_file)
+        data_key = f"upload:{content_hash}"
     else:
         try:
-            df = load_default_scores()
+            df, source_mtime = load_default_scores()
+            # What the refresh button compares against; also keys the views
+            st.session_state["xlsx_mtime"] = source_mtime
+            data_key = f"default:{source_mtime}"
         except Exception as e:
             st.error(
                 "Could not load `scores.xlsx`. "
@@ -185,8 +426,14 @@ with st.sidebar:
 
     st.markdown("---")
     if st.button("🔄 Refresh data"):
-        st.cache_data.clear()
-        st.experimental_rerun()
+        # Only reload when the workbook on disk differs from the one the cached
+        # frame was built from. Clearing just this loader leaves other users'
+        # uploads and views cached; the views are keyed on the mtime anyway.
+        if _mtime("scores.xlsx") != st.session_state.get("xlsx_mtime"):
+            load_default_scores.clear()
+            st.rerun()
+        else:
+            st.toast("Data unchanged — scores.xlsx has not been modified.")
 
     st.caption(
         "Tip: update `scores.xlsx` (or upload a new file) and hit refresh to see latest standings."
@@ -195,29 +442,7 @@ with st.sidebar:
 # =========================
 # APPLY SORTING & LIMIT
 # =========================
-df_sorted = (
-    df.sort_values(by=sort_option, ascending=ascending)
-    .head(show_top_n)
-    .reset_index(drop=True)
-)
-df_sorted["Rank"] = df_sorted.index + 1
-
-# =========================
-# HEADER
-# =========================
-st.markdown(
-    """
-    <div class="leaderboard-title">
-        🏭 Factory Frenzy Leaderboard
-    </div>
-    <div class="leaderboard-subtitle">
-        Real-time bragging rights for the most efficient (and least chaotic) factory teams.
-    </div>
-    """,
-    unsafe_allow_html=True,
-)
-
-st.markdown("")
+df_sorted = sorted_view(data_key, sort_option, ascending, show_top_n, df)
 
 # =========================
 # TOP 3 SPOTLIGHT
@@ -225,38 +450,10 @@ st.markdown("")
 st.subheader("👑 Top Teams")
 
 top3 = df_sorted.head(3)
-crowns = ["🥇", "🥈", "🥉"]
-accent_emojis = ["🔥", "⚡", "💥"]
-
-cols = st.columns(3)
-for i in range(len(top3)):
-    row = top3.iloc[i]
-    col = cols[i]
-    with col:
-        orders_val = "-" if pd.isna(row["Orders"]) else int(row["Orders"])
-        budget_val = "-" if pd.isna(row["Budget_Left"]) else int(row["Budget_Left"])
-
-        st.markdown(
-            f"""
-            <div class="rank-card">
-                <div class="rank-title">Rank {row['Rank']}</div>
-                <div class="rank-name">{crowns[i]} {row['Team']} {accent_emojis[i]}</div>
-                <div class="rank-score">
-                    {row['Reputation']}
-                    <span style="font-size:0.9rem; margin-left:0.2rem; font-weight:500;">
-                        Reputation
-                    </span>
-                </div>
-                <div class="rank-meta">
-                    Orders: <b>{orders_val}</b> · 
-                    Accuracy: <b>{row['Accuracy_%']}%</b> · 
-                    Budget left: <b>₹{budget_val}</b><br/>
-                    Badges: {row['Badges']}
-                </div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+
+# One HTML element for all three cards; the flex row replaces st.columns
+rows = tuple(top3[CARD_COLUMNS].itertuples(index=False, name=None))
+st.html(build_top3_html(rows))
 
 st.markdown("")
 
@@ -265,21 +462,14 @@ st.markdown("")
 # =========================
 st.subheader("📊 Full Leaderboard")
 
-display_cols = ["Rank", "Team", "Reputation", "Orders", "Accuracy_%", "Budget_Left", "Badges"]
-table_df = df_sorted[display_cols].copy().set_index("Rank")
+table = leaderboard_table(data_key, sort_option, ascending, show_top_n, df_sorted)
 
-st.dataframe(table_df, use_container_width=True)
+# Rank is the first column of the Arrow table, so it stands in for the index
+st.dataframe(table, use_container_width=True, hide_index=True)
 
 # =========================
 # CHARTS
 # =========================
 st.markdown("")
-c1, c2 = st.columns(2)
-
-with c1:
-    st.markdown("#### 📈 Reputation distribution")
-    st.bar_chart(df_sorted.set_index("Team")["Reputation"])
-
-with c2:
-    st.markdown("#### 🎯 Accuracy distribution")
-    st.bar_chart(df_sorted.set_index("Team")["Accuracy_%"])
+st.markdown("#### 📈 Reputation & 🎯 accuracy distribution")
+render_charts(df_sorted)